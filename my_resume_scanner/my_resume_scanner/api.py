@@ -0,0 +1,179 @@
+"""Local async HTTP scoring API for ATS integrations.
+
+Shares the scoring engine with the Streamlit app. Text extraction,
+preprocessing and scoring run on a thread pool, so the spaCy model, the
+registered resumes and the cached component arrays are shared by every
+request while the event loop keeps serving others.
+
+    POST /jobs                     {"name": ..., "text": ...}
+    GET  /jobs
+    POST /resumes                  {"name": ..., "text": ...} or {"resumes": [{"name": ..., "text": ...}, ...]}
+    GET  /jobs/{name}/ranking      ?limit=10&skills=0.5&experience=0.3&ats=0.2&similarity=0&order=overall&pool=archive&sections=1
+
+    python api.py   # serves on 127.0.0.1:$RESUME_API_PORT (default 8080), preprocessing
+                    # with the $RESUME_API_ENGINE engine (default spaCy)
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from aiohttp import web
+from engine import (SCORE_WEIGHTS, RANK_ORDERS, PREPROCESSORS, build_resume_record, extract_skills,
+                    extract_experience_requirements, score_components, rank_candidates, results_table)
+from guardrails import MAX_BATCH_DOCUMENTS, MAX_CONCURRENT, MAX_FILE_MB
+from matrix_store import DEFAULT_STORE_DIR, MatrixStore, stream_top_k, top_k_components
+
+class ScoringService:
+    def __init__(self, executor, preprocess, engine, archive_path=DEFAULT_STORE_DIR):
+        self.executor = executor
+        self.preprocess = preprocess
+        self.engine = engine
+        self.archive_path = archive_path
+        self.archive_lock = threading.Lock()
+        self.archive_cache = None  # (meta.json mtime, MatrixStore)
+        self.jobs = {}
+        self.resumes = {}
+        self.version = 0  # bumped on every job or resume change to invalidate cached components
+        self.components = {}
+
+    async def run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def add_job(self, name, text):
+        self.jobs[name] = await self.run(self.preprocess, text)
+        self._invalidate()
+        return {"name": name, "skills": extract_skills(self.jobs[name]),
+                "experience": list(extract_experience_requirements(self.jobs[name]))}
+
+    async def add_resumes(self, documents):
+        records = await asyncio.gather(*(self.run(self._build_record, document["text"]) for document in documents))
+        for document, record in zip(documents, records):
+            self.resumes[document["name"]] = record
+        self._invalidate()
+        return [document["name"] for document in documents]
+
+    def _invalidate(self):
+        self.version += 1
+        self.components.clear()
+
+    def _build_record(self, text):
+        return build_resume_record(self.preprocess(text), self.engine, text)
+
+    def archive(self):
+        # Opened once and reopened only when the archive changes on disk; None without an archive
+        try:
+            modified = os.stat(os.path.join(self.archive_path, "meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self.archive_lock:
+            if self.archive_cache is None or self.archive_cache[0] != modified:
+                self.archive_cache = (modified, MatrixStore(self.archive_path))
+            return self.archive_cache[1]
+
+    async def ranking(self, name, weights, limit, archive=None, section_aware=False, order_by="similarity"):
+        # Ranks the given archive (a MatrixStore) instead of the uploaded resumes
+        if archive is not None:
+            return await self.run(self._archive_ranking, name, self.jobs[name], archive, weights, limit, section_aware, order_by)
+        if not self.resumes:
+            return []
+        key = (name, self.version, section_aware)
+        if key not in self.components:
+            self.components[key] = await self.run(score_components, self.jobs[name], dict(self.resumes), section_aware)
+        components = self.components[key]
+        return await self.run(self._ranking, name, components, dict(self.resumes), weights, limit, order_by)
+
+    @staticmethod
+    def _ranking(name, components, records, weights, limit, order_by):
+        overall, order = rank_candidates(components, weights, order_by)
+        return results_table(name, components, overall, order[:limit]).to_dict("records")
+
+    @staticmethod
+    def _archive_ranking(name, job_text, store, weights, limit, section_aware, order_by):
+        best = stream_top_k(store, job_text, weights, k=limit, section_aware=section_aware, order_by=order_by)
+        components, _ = top_k_components(store, best, section_aware)
+        return results_table(name, components, best["overall"], np.arange(len(best["indices"]))).to_dict("records")
+
+def _error(status, message):
+    return web.json_response({"error": message}, status=status)
+
+async def _read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+def _documents(payload):
+    # Accept one {"name", "text"} document or a {"resumes": [...]} batch
+    documents = payload.get("resumes", [payload]) if isinstance(payload, dict) else None
+    if not isinstance(documents, list) or not all(
+            isinstance(document, dict) and isinstance(document.get("name"), str) and isinstance(document.get("text"), str)
+            for document in documents):
+        return None
+    return documents
+
+async def add_job(request):
+    payload = await _read_json(request)
+    if not isinstance(payload, dict) or not isinstance(payload.get("name"), str) or not isinstance(payload.get("text"), str):
+        return _error(400, "Expected a JSON object with 'name' and 'text'")
+    return web.json_response(await request.app["service"].add_job(payload["name"], payload["text"]), status=201)
+
+async def list_jobs(request):
+    return web.json_response({"jobs": list(request.app["service"].jobs)})
+
+async def add_resumes(request):
+    documents = _documents(await _read_json(request))
+    if documents is None:
+        return _error(400, "Expected {'name', 'text'} or {'resumes': [{'name', 'text'}, ...]}")
+    if len(documents) > MAX_BATCH_DOCUMENTS:
+        return _error(413, f"At most {MAX_BATCH_DOCUMENTS} resumes per request")
+    if any(len(document["text"].encode("utf-8")) > MAX_FILE_MB * 1024 * 1024 for document in documents):
+        return _error(413, f"Resumes must be smaller than {MAX_FILE_MB:g} MB")
+    return web.json_response({"added": await request.app["service"].add_resumes(documents)}, status=201)
+
+async def ranking(request):
+    service = request.app["service"]
+    name = request.match_info["name"]
+    if name not in service.jobs:
+        return _error(404, f"Unknown job: {name}")
+    archive = None
+    if request.query.get("pool", "uploaded") == "archive":
+        # Opening the archive reads from disk, so it runs off the event loop
+        archive = await service.run(service.archive)
+        if archive is None:
+            return _error(404, "No resume archive on this server")
+        if archive.engine != service.engine:
+            return _error(409, f"The archive was preprocessed with the {archive.engine} engine, "
+                               f"this server uses {service.engine}")
+    try:
+        limit = int(request.query.get("limit", 10))
+        weights = {key: float(request.query.get(key, default)) for key, default in SCORE_WEIGHTS.items()}
+    except ValueError:
+        return _error(400, "limit and weights must be numbers")
+    order_by = request.query.get("order", "similarity")
+    if order_by not in RANK_ORDERS:
+        return _error(400, f"order must be one of: {', '.join(RANK_ORDERS)}")
+    section_aware = request.query.get("sections", "0").lower() in ("1", "true", "yes")
+    results = await service.ranking(name, weights, max(limit, 0), archive, section_aware, order_by)
+    return web.json_response({"job": name, "results": results})
+
+def create_app(engine="spaCy", preprocess=None, workers=MAX_CONCURRENT, archive_path=DEFAULT_STORE_DIR):
+    # preprocess overrides the engine's PREPROCESSORS function, e.g. for text that is already preprocessed
+    # Room for a full batch at the upload limits plus names and JSON syntax;
+    # aiohttp's default of 1 MiB would reject far smaller batches
+    app = web.Application(client_max_size=int(MAX_BATCH_DOCUMENTS * MAX_FILE_MB * 1024 * 1024) + 1024 * 1024)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    app["service"] = ScoringService(executor, preprocess or PREPROCESSORS[engine], engine, archive_path)
+    app.router.add_post("/jobs", add_job)
+    app.router.add_get("/jobs", list_jobs)
+    app.router.add_post("/resumes", add_resumes)
+    app.router.add_get("/jobs/{name}/ranking", ranking)
+
+    async def shutdown_executor(app):
+        executor.shutdown(wait=False)
+    app.on_cleanup.append(shutdown_executor)
+    return app
+
+if __name__ == "__main__":
+    web.run_app(create_app(os.environ.get("RESUME_API_ENGINE", "spaCy")), host="127.0.0.1",
+                port=int(os.environ.get("RESUME_API_PORT", 8080)))
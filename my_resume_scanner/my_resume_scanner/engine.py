@@ -0,0 +1,378 @@
+import re
+import numpy as np
+import pandas as pd
+import spacy
+from datetime import datetime
+from difflib import SequenceMatcher
+from functools import lru_cache
+from io import BytesIO
+from PyPDF2 import PdfReader
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from fast_tokenizer import preprocess_text_fast
+
+SPACY_MODEL = "en_core_web_sm"
+
+@lru_cache(maxsize=None)
+def load_nlp():
+    # Loaded on first use, so scoring already-preprocessed text doesn't need the model
+    return spacy.load(SPACY_MODEL)
+
+SKILL_KEYWORDS = ["python", "java", "sql", "machine learning", "excel", "communication", "project management", "power bi", "r", "data analysis", "cloud", "aws", "azure"]
+
+# Heading aliases per section, in both raw and lemmatized form so they match
+# the original text as well as the output of preprocess_text.
+SECTION_HEADINGS = {
+    "summary": ["summary", "professional summary", "career summary", "profile", "professional profile", "objective", "career objective"],
+    "experience": ["experience", "work experience", "professional experience", "employment history", "work history", "employment"],
+    "education": ["education", "academic background", "qualification", "qualifications", "educational qualification", "educational qualifications"],
+    "skills": ["skill", "skills", "key skill", "key skills", "technical skill", "technical skills", "core competency", "core competencies"],
+    "projects": ["project", "projects", "personal project", "personal projects", "academic project", "academic projects"],
+}
+_HEADING_LOOKUP = {alias: section for section, aliases in SECTION_HEADINGS.items() for alias in aliases}
+_HEADING_ALIASES = '|'.join(re.escape(alias) for alias in sorted(_HEADING_LOOKUP, key=len, reverse=True))
+# "Skills: Python, SQL" style lines, where the body follows the heading on the same
+# line. A separator is required, so body lines such as "Project manager with ..."
+# are not taken for headings.
+_INLINE_HEADING_RE = re.compile(r'[ \t\-|•]*(' + _HEADING_ALIASES + r')[ \t]*[:|•\-\u2013][ \t]*\S')
+# The heading words at the start of a line, to find where its body begins
+_HEADING_PREFIX_RE = re.compile(r'[ \t:\-|•]*(' + _HEADING_ALIASES + r')\b[ \t:\-|•\u2013]*')
+
+# With section-aware scoring, skills only mentioned in passing (outside the
+# Skills section, or anywhere when there is none) earn partial credit
+SKILL_MENTION_WEIGHT = 0.6
+
+# Default weights of the overall score; similarity is the raw TF-IDF cosine
+SCORE_WEIGHTS = {"skills": 0.5, "experience": 0.3, "ats": 0.2, "similarity": 0.0}
+
+def extract_text_from_pdf(pdf_file, max_pages=None):
+    reader = PdfReader(pdf_file)
+    if max_pages is not None and len(reader.pages) > max_pages:
+        raise ValueError(f"{len(reader.pages)} pages, the limit is {max_pages}")
+    text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
+    return text
+
+def preprocess_text(text):
+    doc = load_nlp()(text.lower())
+    return " ".join([token.lemma_ for token in doc if not token.is_stop and not token.is_punct])
+
+# Selectable preprocessing engines; "Fast" skips the spaCy pipeline entirely
+PREPROCESSORS = {"spaCy": preprocess_text, "Fast": preprocess_text_fast}
+AGREEMENT_SAMPLE_SIZE = 5  # documents per upload re-run through spaCy to report fast-engine agreement
+
+def preprocessing_agreement(texts):
+    # Share of tokens the fast engine reproduces from the full spaCy output
+    matched, total = 0, 0
+    for text in texts:
+        full, fast = preprocess_text(text).split(), preprocess_text_fast(text).split()
+        matched += 2 * sum(block.size for block in SequenceMatcher(None, full, fast, autojunk=False).get_matching_blocks())
+        total += len(full) + len(fast)
+    return matched / total if total else 1.0
+
+def segment_sections(text, raw_text=None):
+    # Find heading lines and return {section: (start, end)} offsets of each section body.
+    # raw_text is the same document before preprocessing: both preprocessors keep
+    # the line breaks, and the raw lines still show the separators of inline headings.
+    lines = text.lower().split("\n")
+    raw_lines = raw_text.lower().split("\n") if raw_text is not None else lines
+    if len(raw_lines) != len(lines):
+        raw_lines = lines
+    headings = []
+    seen = set()
+    line_start = 0
+    for line, raw_line in zip(lines, raw_lines):
+        line_end = line_start + len(line)
+        section = _HEADING_LOOKUP.get(line.strip(" \t:-|•").strip()) or _HEADING_LOOKUP.get(raw_line.strip(" \t:-|•").strip())
+        body_start = line_end
+        if not section:
+            # An inline heading only counts for a section not seen yet
+            match = _INLINE_HEADING_RE.match(raw_line)
+            if match and _HEADING_LOOKUP[match.group(1)] not in seen:
+                section = _HEADING_LOOKUP[match.group(1)]
+                prefix = _HEADING_PREFIX_RE.match(line)
+                body_start = line_start + prefix.end() if prefix else line_start
+        if section:
+            seen.add(section)
+            headings.append((section, line_start, body_start))
+        line_start = line_end + 1
+
+    sections = {}
+    for i, (section, _, body_start) in enumerate(headings):
+        body_end = headings[i + 1][1] if i + 1 < len(headings) else len(text)
+        sections.setdefault(section, (body_start, body_end))
+    return sections
+
+def section_text(document, *names):
+    # Text of the named sections, or the whole document when none of them were found
+    spans = [document["sections"][name] for name in names if name in document["sections"]]
+    if not spans:
+        return document["text"]
+    return "\n".join(document["text"][start:end] for start, end in spans)
+
+def extract_skills(text):
+    return [skill for skill in SKILL_KEYWORDS if skill in text.lower()]
+
+def extract_experience(text):
+    text = text.lower()
+    total_experience = 0
+    years_set = set()
+    exp_matches = re.findall(r'(\d+)\s*(?:\+)?\s*(?:years?|yrs?)', text)
+    numeric_exp = [int(x) for x in exp_matches]
+    if numeric_exp:
+        total_experience = max(total_experience, max(numeric_exp))
+    range_matches = re.findall(r'(\d+)\s*[\u2013\-to]+\s*(\d+)\s*(?:years?|yrs?)', text)
+    for start, end in range_matches:
+        try:
+            total_experience = max(total_experience, int(end))
+        except:
+            continue
+    date_matches = re.findall(r'(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]\s+)?(\d{4})\s[\u2013\-to]+\s*(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\s+)?(\d{4}|present)', text)
+    for start_year, end_year in date_matches:
+        try:
+            start_year = int(start_year)
+            end_year = datetime.now().year if end_year == 'present' else int(end_year)
+            if 1950 <= start_year <= end_year <= datetime.now().year + 1:
+                for yr in range(start_year, end_year):
+                    years_set.add(yr)
+        except:
+            continue
+    total_experience = max(total_experience, len(years_set))
+    return total_experience
+
+def extract_experience_requirements(text):
+    text = text.lower()
+    range_match = re.search(r'(\d+)\s*(?:\+)?\s*(?:[\-\u2013to]{1,3})\s*(\d+)\s*(?:years?|yrs?)', text)
+    if range_match:
+        return int(range_match.group(1)), int(range_match.group(2))
+    single_match = re.search(r'(\d+)\s*(?:\+)?\s*(?:years?|yrs?)', text)
+    if single_match:
+        return int(single_match.group(1)), int(single_match.group(1)) + 2
+    return 0, 0
+
+def ats_format_checks(text):
+    # The checks of check_ats_format that don't depend on headings
+    return {
+        "tables": bool(re.search(r'\n\s*\|', text)),
+        "contact": bool(re.search(r'(phone|contact|email|e-mail|mobile)', text.lower())),
+        "numeric_dates": bool(re.search(r'\d{1,2}/\d{1,2}/\d{2,4}', text)),
+    }
+
+def check_ats_format(text, sections=None, format_checks=None):
+    # Without sections, headings are found by substring tests as before.
+    # format_checks (from ats_format_checks) reuses the other checks' results.
+    if format_checks is None:
+        format_checks = ats_format_checks(text)
+    issues = []
+    score = 100  # Start with perfect score
+
+    # Check for tables/columns
+    if format_checks["tables"]:
+        issues.append("Avoid using tables or columns in the resume.")
+        score -= 30
+
+    # Check for required sections
+    required_sections = ["experience", "education", "skills"]
+    if sections is None:
+        missing_sections = [section for section in required_sections if section not in text.lower()]
+    else:
+        missing_sections = [section for section in required_sections if section not in sections]
+    if missing_sections:
+        issues.append(f"Missing common resume headings: {', '.join(missing_sections)}")
+        score -= 20 * len(missing_sections)
+
+    # Check for contact information
+    if not format_checks["contact"]:
+        issues.append("Missing contact information")
+        score -= 15
+
+    # Check for proper dates format
+    if format_checks["numeric_dates"]:
+        issues.append("Use full month names instead of numeric dates (e.g., 'January 2020' instead of '1/2020')")
+        score -= 10
+
+    return issues, max(0, score)  # Ensure score doesn't go below 0
+
+def build_resume_record(text, engine="spaCy", raw_text=None):
+    # One pass of each extractor over the whole text. engine names the
+    # PREPROCESSORS entry that produced text, so records from different engines
+    # are never scored together; raw_text improves heading detection.
+    document = {"text": text, "engine": engine, "sections": segment_sections(text, raw_text)}
+    document["skills"] = extract_skills(text)
+    document["experience"] = extract_experience(text)
+    format_checks = ats_format_checks(text)
+    document["ats_issues"], document["ats_score"] = check_ats_format(text, format_checks=format_checks)
+    document["section_ats_issues"], document["section_ats_score"] = check_ats_format(text, document["sections"], format_checks)
+    return document
+
+def section_features(document):
+    # Skills listed under Skills and experience read from the summary and
+    # experience sections; only section-aware scoring needs them, so they are
+    # computed on first use and kept in the record
+    if "section_experience" not in document:
+        document["listed_skills"] = extract_skills(section_text(document, "skills")) if "skills" in document["sections"] else []
+        document["section_experience"] = extract_experience(section_text(document, "summary", "experience"))
+    return document
+
+def record_features(document, section_aware=False):
+    # (experience, ats_issues, ats_score) under the chosen scoring mode
+    if section_aware:
+        section_features(document)
+        return document["section_experience"], document["section_ats_issues"], document["section_ats_score"]
+    return document["experience"], document["ats_issues"], document["ats_score"]
+
+def skill_match_score(job_skills, document, section_aware=False):
+    if not job_skills:
+        return 0
+    matched = set(job_skills).intersection(document["skills"])
+    if not section_aware:
+        return len(matched) / len(job_skills)
+    listed = set(section_features(document)["listed_skills"])
+    credit = sum(1.0 if skill in listed else SKILL_MENTION_WEIGHT for skill in matched)
+    return credit / len(job_skills)
+
+def experience_match_score(resume_exp, job_exp_min, job_exp_max):
+    # Improved experience matching calculation
+    if job_exp_min == 0 and job_exp_max == 0:
+        return 0.7
+    elif resume_exp >= job_exp_max:
+        return 1.0  # Full points for meeting or exceeding max
+    elif resume_exp >= job_exp_min:
+        if job_exp_max > job_exp_min:
+            return 0.7 + 0.3 * ((resume_exp - job_exp_min) / (job_exp_max - job_exp_min))
+        else:
+            return 0.9
+    elif resume_exp > 0:
+        return 0.3 * (resume_exp / job_exp_min)
+    else:
+        # Below minimum - scale down more aggressively
+        return 0.0
+
+def experience_match_array(resume_exp, job_exp_min, job_exp_max):
+    # Vectorized experience_match_score over an array of candidate experience
+    resume_exp = np.asarray(resume_exp, dtype=float)
+    if job_exp_min == 0 and job_exp_max == 0:
+        return np.full(resume_exp.shape, 0.7)
+    if job_exp_max > job_exp_min:
+        in_range = 0.7 + 0.3 * ((resume_exp - job_exp_min) / (job_exp_max - job_exp_min))
+    else:
+        in_range = np.full(resume_exp.shape, 0.9)
+    below = 0.3 * (resume_exp / (job_exp_min or 1))
+    return np.select([resume_exp >= job_exp_max, resume_exp >= job_exp_min, resume_exp > 0], [1.0, in_range, below], 0.0)
+
+def skill_match_array(found, listed, job_mask, section_aware=False):
+    # Vectorized skill_match_score over (candidates x SKILL_KEYWORDS) boolean matrices
+    if not job_mask.any():
+        return np.zeros(len(found))
+    if section_aware:
+        credit = np.where(listed, 1.0, SKILL_MENTION_WEIGHT) * (found & job_mask)
+    else:
+        credit = (found & job_mask).astype(float)
+    return credit.sum(axis=1) / job_mask.sum()
+
+def score_components(job_text, records, section_aware=False):
+    # Per-candidate score components for one job, as arrays aligned with names
+    names = list(records)
+    if names:
+        vectorizer = TfidfVectorizer()
+        job_vector = vectorizer.fit_transform([job_text])
+        resume_vectors = vectorizer.transform(records[name]["text"] for name in names)
+        similarity = cosine_similarity(job_vector, resume_vectors).flatten()
+    else:
+        # Cascade mode pruned everyone; cosine_similarity rejects an empty matrix
+        similarity = np.zeros(0)
+
+    job_skills = extract_skills(job_text)
+    job_exp_min, job_exp_max = extract_experience_requirements(job_text)
+
+    job_mask = np.array([skill in job_skills for skill in SKILL_KEYWORDS])
+    found = np.array([[skill in records[name]["skills"] for skill in SKILL_KEYWORDS] for name in names], dtype=bool).reshape(len(names), len(SKILL_KEYWORDS))
+    if section_aware:
+        listed = np.array([[skill in section_features(records[name])["listed_skills"] for skill in SKILL_KEYWORDS] for name in names], dtype=bool).reshape(len(names), len(SKILL_KEYWORDS))
+    else:
+        listed = np.zeros_like(found)
+    missing = job_mask & ~found
+
+    features = [record_features(records[name], section_aware) for name in names]
+    experience = np.array([feature[0] for feature in features], dtype=float)
+    ats = np.array([feature[2] for feature in features], dtype=float)
+
+    return {
+        "names": names,
+        "job_skills": job_skills,
+        "job_exp": (job_exp_min, job_exp_max),
+        "similarity": similarity,
+        "skills": skill_match_array(found, listed, job_mask, section_aware),
+        "resume_exp": experience,
+        "experience": experience_match_array(experience, job_exp_min, job_exp_max),
+        "ats": ats,
+        "ats_issues": ["; ".join(feature[1]) for feature in features],
+        "missing_skills": [", ".join(np.array(SKILL_KEYWORDS)[row]) for row in missing],
+    }
+
+def cascade_filter(records, required_skills, min_experience, section_aware=False):
+    # Cheap prefilters on the features precomputed at upload time; only the
+    # survivors go on to TF-IDF similarity and full scoring
+    stages = {"pool": len(records)}
+    survivors = [name for name in records if set(required_skills).issubset(records[name]["skills"])]
+    stages["skills"] = len(survivors)
+    survivors = [name for name in survivors if record_features(records[name], section_aware)[0] >= min_experience]
+    stages["experience"] = len(survivors)
+    return {name: records[name] for name in survivors}, stages
+
+def overall_scores(components, weights=SCORE_WEIGHTS):
+    # Weighted overall score (0-100) of every candidate
+    total = sum(weights.values()) or 1.0
+    overall = (components["skills"] * weights["skills"] + components["experience"] * weights["experience"]
+               + (components["ats"] / 100) * weights["ats"] + components["similarity"] * weights["similarity"]) / total
+    return np.round(overall * 100, 2)
+
+# Candidate orderings, as sort keys from most to least significant. The original
+# app ranks by TF-IDF similarity alone; ranking by overall score is opt-in.
+RANK_ORDERS = {"similarity": ("similarity",), "overall": ("overall", "similarity")}
+
+def rank_order(overall, similarity, order_by="similarity"):
+    # Best first; remaining ties keep their input order
+    keys = {"overall": -overall, "similarity": -similarity}
+    return np.lexsort([keys[field] for field in reversed(RANK_ORDERS[order_by])])
+
+def rank_candidates(components, weights=SCORE_WEIGHTS, order_by="similarity"):
+    # Overall scores and candidate order, best first
+    overall = overall_scores(components, weights)
+    return overall, rank_order(overall, components["similarity"], order_by)
+
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def results_table(job_name, components, overall, order):
+    # Full ranking as one columnar table, built straight from the component arrays
+    names = np.array(components["names"], dtype=object)[order]
+    return pd.DataFrame({
+        "rank": np.arange(1, len(order) + 1),
+        "job": job_name,
+        "candidate": names,
+        "overall_score": overall[order],
+        "skill_match": components["skills"][order],
+        "experience_match": components["experience"][order],
+        "ats_score": components["ats"][order],
+        "similarity": components["similarity"][order],
+        "resume_experience": components["resume_exp"][order],
+        "missing_skills": np.array(components["missing_skills"], dtype=object)[order],
+        "ats_issues": np.array(components["ats_issues"], dtype=object)[order],
+    })
+
+def export_results(table, fmt):
+    # Serialize the results table; Parquet needs pyarrow and Excel needs openpyxl
+    buffer = BytesIO()
+    if fmt == "CSV":
+        table.to_csv(buffer, index=False)
+    elif fmt == "Parquet":
+        table.to_parquet(buffer, index=False)
+    elif fmt == "Excel":
+        table.to_excel(buffer, index=False, sheet_name="Ranking")
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,85 @@
+"""Fast preprocessing without the spaCy pipeline.
+
+A compiled regex tokenizer, spaCy's English stopword list and a precomputed
+lemma lookup table stand in for preprocess_text. Lemmas come from
+lemma_lookup.json (or RESUME_LEMMA_TABLE). The shipped table is spaCy's
+English lookup lemmatizer data (spacy-lookups-data, derived from WordNet, see
+lemma_lookup_LICENSE.txt); it can be rebuilt, or replaced by a table learned
+from spaCy's own output on your documents:
+
+    python fast_tokenizer.py lookups
+    python fast_tokenizer.py build <folder of PDF/TXT documents>
+
+Without a table, spacy-lookups-data is used if installed; otherwise LEMMAS is
+empty and the Fast engine is not offered.
+"""
+import gzip
+import json
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from spacy.lang.en.stop_words import STOP_WORDS
+
+LEMMA_TABLE_PATH = os.environ.get("RESUME_LEMMA_TABLE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lemma_lookup.json"))
+
+# Newline runs are kept as tokens like spaCy's whitespace tokens, so section
+# headings still sit on their own lines. Table pipes and slash-joined numbers
+# (dates) survive as in spaCy's output, which the ATS checks look for; other
+# punctuation is dropped
+TOKEN_RE = re.compile(r"\n+|\||\d+(?:/\d+)+|\w[\w.@'+#]*[\w+#]|\w")
+
+def load_lemma_table(path=LEMMA_TABLE_PATH):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    try:
+        return lookups_lemma_table()
+    except ImportError:
+        return {}
+
+def lookups_lemma_table():
+    # spaCy's English lookup lemmas, for the lowercase forms the tokenizer produces
+    from importlib.resources import files
+    with gzip.open(files("spacy_lookups_data") / "data" / "en_lemma_lookup.json.gz", "rt", encoding="utf-8") as f:
+        table = json.load(f)
+    return {form: lemma for form, lemma in table.items() if form == form.lower() and lemma != form}
+
+LEMMAS = load_lemma_table()
+
+def preprocess_text_fast(text):
+    tokens = TOKEN_RE.findall(text.lower())
+    return " ".join(LEMMAS.get(token, token) for token in tokens if token not in STOP_WORDS)
+
+def build_lemma_table(texts, nlp):
+    # Most frequent spaCy lemma of every lowercase word form seen in texts
+    seen = defaultdict(Counter)
+    for doc in nlp.pipe(text.lower() for text in texts):
+        for token in doc:
+            if not token.is_space and not token.is_punct and token.lemma_ != token.text:
+                seen[token.text][token.lemma_] += 1
+    return {form: lemmas.most_common(1)[0][0] for form, lemmas in seen.items()}
+
+def save_lemma_table(table, path=LEMMA_TABLE_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(table, f, sort_keys=True, indent=0, ensure_ascii=False)
+        f.write("\n")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "lookups":
+        table = lookups_lemma_table()
+    elif len(sys.argv) == 3 and sys.argv[1] == "build":
+        from engine import load_nlp, extract_text_from_pdf
+        texts = []
+        for file_name in sorted(os.listdir(sys.argv[2])):
+            file_path = os.path.join(sys.argv[2], file_name)
+            if file_name.lower().endswith(".pdf"):
+                texts.append(extract_text_from_pdf(file_path))
+            elif file_name.lower().endswith(".txt"):
+                with open(file_path, encoding="utf-8") as f:
+                    texts.append(f.read())
+        table = build_lemma_table(texts, load_nlp())
+    else:
+        sys.exit("Usage: python fast_tokenizer.py lookups | build <folder of PDF/TXT documents>")
+    save_lemma_table(table)
+    print(f"Wrote {len(table)} lemmas to {LEMMA_TABLE_PATH}")
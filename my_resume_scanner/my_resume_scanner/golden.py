@@ -0,0 +1,295 @@
+"""Golden-corpus equivalence harness for the scoring engine.
+
+golden/expected.json holds the output of the original Matching view (its
+scoring loop is kept verbatim in reference_ranking) for the sample jobs and
+resumes in golden/. Every optimized or batched path is checked against it,
+so any change in scores or ranking order shows up as a mismatch:
+
+    python golden.py check            # before shipping a faster path
+    python -m pytest tests            # the same check, one test per path
+
+Scoring runs on the preprocessed texts in golden/preprocessed/, so the check
+does not need the spaCy model. golden/preprocessed/model.json names the
+pipeline that produced them. Where the model is installed, preprocess_text is
+checked against them, and inputs from any other pipeline or model version
+fail the check. After an intended change or a model upgrade:
+
+    python golden.py preprocess       # re-run preprocess_text on the raw texts
+    python golden.py record           # re-record expected.json from the reference
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from sklearn.feature_extraction.text import TfidfVectorizer
+import engine
+import matrix_store
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+PREPROCESSED_DIR = os.path.join(GOLDEN_DIR, "preprocessed")
+MODEL_PATH = os.path.join(PREPROCESSED_DIR, "model.json")
+EXPECTED_PATH = os.path.join(GOLDEN_DIR, "expected.json")
+
+# Absolute tolerances for floating-point fields; everything else must match exactly.
+# Overall scores are rounded to 2 decimals, so they may differ by one unit in the last place.
+TOLERANCES = {"similarity": 1e-9, "skill_match": 1e-9, "experience_match": 1e-9, "overall_score": 0.01}
+
+def load_corpus(folder=GOLDEN_DIR):
+    # {"jobs": {file name: text}, "resumes": {...}}, raw or preprocessed
+    corpus = {}
+    for kind in ("jobs", "resumes"):
+        corpus[kind] = {}
+        for file_name in sorted(os.listdir(os.path.join(folder, kind))):
+            with open(os.path.join(folder, kind, file_name), encoding="utf-8", newline="") as f:
+                corpus[kind][file_name] = f.read()
+    return corpus
+
+def reference_ranking(job_text, records):
+    # The original Matching view: one TF-IDF vectorizer fitted on the job, then
+    # every resume scored on its own and the list sorted by similarity alone
+    vectorizer = TfidfVectorizer()
+    job_vector = vectorizer.fit_transform([job_text])
+    job_skills = engine.extract_skills(job_text)
+    job_exp_min, job_exp_max = engine.extract_experience_requirements(job_text)
+    rows = []
+    for resume_name, record in records.items():
+        resume_text = record["text"]
+        # Both vectors are L2-normalized, so the dot product is the cosine similarity
+        similarity = float(vectorizer.transform([resume_text]).dot(job_vector.T).toarray()[0, 0])
+        resume_skills = engine.extract_skills(resume_text)
+        resume_exp = engine.extract_experience(resume_text)
+        ats_issues, ats_score = engine.check_ats_format(resume_text)
+
+        skill_match = len(set(job_skills).intersection(resume_skills)) / len(job_skills) if job_skills else 0
+
+        if job_exp_min == 0 and job_exp_max == 0:
+            experience_match = 0.7
+        elif resume_exp >= job_exp_max:
+            experience_match = 1.0
+        elif resume_exp >= job_exp_min:
+            if job_exp_max > job_exp_min:
+                experience_match = 0.7 + 0.3 * ((resume_exp - job_exp_min) / (job_exp_max - job_exp_min))
+            else:
+                experience_match = 0.9
+        elif resume_exp > 0:
+            experience_match = 0.3 * (resume_exp / job_exp_min)
+        else:
+            experience_match = 0.0
+
+        overall_score = round((skill_match * 0.5 + experience_match * 0.3 + (ats_score / 100) * 0.2) * 100, 2)
+        rows.append({"candidate": resume_name, "overall_score": overall_score, "similarity": similarity,
+                     "skill_match": skill_match, "experience_match": experience_match, "ats_score": ats_score})
+    return sorted(rows, key=lambda row: row["similarity"], reverse=True)
+
+def vectorized_ranking(job_text, records):
+    # The Matching view path: cached component arrays and one vectorized re-rank
+    components = engine.score_components(job_text, records)
+    overall, order = engine.rank_candidates(components)
+    return [{"candidate": components["names"][i], "overall_score": float(overall[i]),
+             "similarity": float(components["similarity"][i]), "skill_match": float(components["skills"][i]),
+             "experience_match": float(components["experience"][i]), "ats_score": float(components["ats"][i])}
+            for i in order]
+
+def cascade_ranking(job_text, records):
+    # Cascade mode with requirements every candidate meets: pruning must not change scores
+    survivors, _ = engine.cascade_filter(records, [], 0)
+    return vectorized_ranking(job_text, survivors)
+
+def archive_ranking(job_text, records, **prefilters):
+    # The resume archive path: memory-mapped CSR store scored in small chunks
+    with tempfile.TemporaryDirectory() as path:
+        matrix_store.MatrixStoreWriter(path).add_batch(records)
+        store = matrix_store.MatrixStore(path)
+        best = matrix_store.stream_top_k(store, job_text, k=len(store), chunk_size=2, **prefilters)
+        names = [store.record(i)["name"] for i in best["indices"]]
+        del store
+    return [{"candidate": name, "overall_score": float(best["overall"][j]), "similarity": float(best["similarity"][j]),
+             "skill_match": float(best["skills"][j]), "experience_match": float(best["experience"][j]),
+             "ats_score": float(best["ats"][j])}
+            for j, name in enumerate(names)]
+
+def api_ranking(job_text, records):
+    # The HTTP service, driven through aiohttp's in-process test client. The
+    # texts are already preprocessed, so the service is told to keep them as is.
+    return asyncio.run(_api_ranking(job_text, records))
+
+async def _api_ranking(job_text, records):
+    import api
+    from aiohttp.test_utils import TestClient, TestServer
+    async with TestClient(TestServer(api.create_app(preprocess=lambda text: text))) as client:
+        await client.post("/jobs", json={"name": "job", "text": job_text})
+        await client.post("/resumes", json={"resumes": [{"name": name, "text": record["text"]} for name, record in records.items()]})
+        response = await client.get("/jobs/job/ranking", params={"limit": len(records)})
+        results = (await response.json())["results"]
+    return [{"candidate": row["candidate"], "overall_score": row["overall_score"], "similarity": row["similarity"],
+             "skill_match": row["skill_match"], "experience_match": row["experience_match"], "ats_score": row["ats_score"]}
+            for row in results]
+
+# Every path must reproduce the recorded outputs
+PATHS = {
+    "reference": reference_ranking,
+    "vectorized": vectorized_ranking,
+    "archive": archive_ranking,
+    "cascade": cascade_ranking,
+    "api": api_ranking,
+    "archive_cascade": lambda job_text, records: archive_ranking(job_text, records, required_skills=[], min_experience=0),
+}
+
+# Approximate preprocessors run the vectorized path on the raw texts; 'check'
+# reports them but they never fail it
+APPROXIMATE_PREPROCESSORS = {"fast": engine.PREPROCESSORS["Fast"]}
+
+def run_path(texts, rank):
+    # Outputs of the text functions and the ranking of every job, as plain JSON values
+    outputs = {"jobs": {}, "resumes": {}, "rankings": {}}
+    for name, job_text in texts["jobs"].items():
+        outputs["jobs"][name] = {
+            "extract_skills": engine.extract_skills(job_text),
+            "extract_experience_requirements": list(engine.extract_experience_requirements(job_text)),
+        }
+    records = {}
+    for name, text in texts["resumes"].items():
+        records[name] = engine.build_resume_record(text)
+        issues, score = engine.check_ats_format(text)
+        outputs["resumes"][name] = {
+            "extract_skills": engine.extract_skills(text),
+            "extract_experience": engine.extract_experience(text),
+            "check_ats_format": [issues, score],
+        }
+    for name, job_text in texts["jobs"].items():
+        outputs["rankings"][name] = rank(job_text, records)
+    return json.loads(json.dumps(outputs))
+
+def compare(expected, actual, where=""):
+    # Returns a list of human-readable mismatches
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        mismatches = [f"{where}.{key}: missing" for key in expected if key not in actual]
+        mismatches += [f"{where}.{key}: unexpected" for key in actual if key not in expected]
+        for key in expected:
+            if key in actual:
+                tolerance = TOLERANCES.get(key)
+                if tolerance is not None:
+                    if abs(expected[key] - actual[key]) > tolerance:
+                        mismatches.append(f"{where}.{key}: expected {expected[key]}, got {actual[key]} (tolerance {tolerance})")
+                else:
+                    mismatches += compare(expected[key], actual[key], f"{where}.{key}")
+        return mismatches
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{where}: expected {len(expected)} items, got {len(actual)}"]
+        mismatches = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            mismatches += compare(e, a, f"{where}[{i}]")
+        return mismatches
+    if expected != actual:
+        return [f"{where}: expected {expected!r}, got {actual!r}"]
+    return []
+
+def compare_ranking(expected, actual, where):
+    # Candidates whose similarities tie within tolerance may swap places
+    mismatches = []
+    if sorted(row["candidate"] for row in expected) != sorted(row["candidate"] for row in actual):
+        return [f"{where}: ranked a different set of candidates"]
+    actual_by_name = {row["candidate"]: row for row in actual}
+    for position, (e, a) in enumerate(zip(expected, actual), start=1):
+        if e["candidate"] != a["candidate"] and abs(e["similarity"] - a["similarity"]) > TOLERANCES["similarity"]:
+            mismatches.append(f"{where} #{position}: expected {e['candidate']}, got {a['candidate']}")
+        mismatches += compare(e, actual_by_name[e["candidate"]], f"{where}.{e['candidate']}")
+    return mismatches
+
+def check_path(expected, outputs):
+    mismatches = []
+    for kind in ("jobs", "resumes"):
+        mismatches += compare(expected[kind], outputs[kind], kind)
+    for job, ranking in expected["rankings"].items():
+        if job not in outputs["rankings"]:
+            mismatches.append(f"rankings.{job}: missing")
+        else:
+            mismatches += compare_ranking(ranking, outputs["rankings"][job], f"rankings.{job}")
+    return mismatches
+
+def preprocessing_model():
+    # The pipeline that produced golden/preprocessed/
+    with open(MODEL_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def installed_model():
+    # The pipeline preprocess_text runs here, or None when it isn't installed
+    try:
+        nlp = engine.load_nlp()
+    except OSError:
+        return None
+    return {"name": f"{nlp.meta['lang']}_{nlp.meta['name']}", "version": nlp.meta["version"]}
+
+def check_preprocessing(model, corpus, inputs):
+    # Mismatches of preprocess_text, running the installed model, against the golden inputs
+    recorded = preprocessing_model()
+    if model != recorded:
+        return [f"golden inputs were preprocessed with {recorded['name']} {recorded['version']}, not "
+                f"{model['name']} {model['version']}: run 'python golden.py preprocess' and 'python golden.py record'"]
+    return [f"preprocessed/{kind}/{name}: preprocess_text output changed"
+            for kind in corpus for name, raw in corpus[kind].items()
+            if engine.preprocess_text(raw) != inputs[kind][name]]
+
+def preprocess():
+    model = installed_model()
+    if model is None:
+        sys.exit(f"preprocess_text needs the spaCy model: python -m spacy download {engine.SPACY_MODEL}")
+    for kind, texts in load_corpus().items():
+        os.makedirs(os.path.join(PREPROCESSED_DIR, kind), exist_ok=True)
+        for name, raw in texts.items():
+            with open(os.path.join(PREPROCESSED_DIR, kind, name), "w", encoding="utf-8", newline="") as f:
+                f.write(engine.preprocess_text(raw))
+    with open(MODEL_PATH, "w", encoding="utf-8") as f:
+        json.dump(model, f, indent=2)
+        f.write("\n")
+    print(f"Preprocessed the golden corpus with {model['name']} {model['version']}")
+
+def record():
+    outputs = run_path(load_corpus(PREPROCESSED_DIR), reference_ranking)
+    with open(EXPECTED_PATH, "w", encoding="utf-8") as f:
+        json.dump(outputs, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Recorded golden outputs to {EXPECTED_PATH}")
+
+def check(paths=None):
+    if not os.path.exists(EXPECTED_PATH):
+        print(f"No golden outputs at {EXPECTED_PATH}; run 'python golden.py record' first")
+        return False
+    with open(EXPECTED_PATH, encoding="utf-8") as f:
+        expected = json.load(f)
+    corpus, inputs = load_corpus(), load_corpus(PREPROCESSED_DIR)
+    failed = False
+    for path_name in paths or PATHS:
+        mismatches = check_path(expected, run_path(inputs, PATHS[path_name]))
+        print(f"{path_name}: {'OK' if not mismatches else f'{len(mismatches)} mismatch(es)'}")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+        failed = failed or bool(mismatches)
+    if not paths:
+        model = installed_model()
+        if model is None:
+            print(f"preprocess_text: NOT CHECKED, {engine.SPACY_MODEL} is not installed")
+        else:
+            mismatches = check_preprocessing(model, corpus, inputs)
+            print(f"preprocess_text: {'OK' if not mismatches else f'{len(mismatches)} mismatch(es)'}")
+            for mismatch in mismatches:
+                print(f"  {mismatch}")
+            failed = failed or bool(mismatches)
+        for path_name, preprocessor in APPROXIMATE_PREPROCESSORS.items():
+            texts = {kind: {name: preprocessor(raw) for name, raw in raw_texts.items()} for kind, raw_texts in corpus.items()}
+            mismatches = check_path(expected, run_path(texts, vectorized_ranking))
+            print(f"{path_name} (approximate): {len(mismatches)} mismatch(es)")
+    return not failed
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "preprocess":
+        preprocess()
+    elif command == "record":
+        record()
+    elif command == "check":
+        sys.exit(0 if check(sys.argv[2:]) else 1)
+    else:
+        sys.exit("Usage: python golden.py [preprocess|record|check [path ...]]")
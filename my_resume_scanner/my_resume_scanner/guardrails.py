@@ -0,0 +1,83 @@
+"""Upload admission control shared by every Streamlit session of the server.
+
+Limits are read from the environment:
+    RESUME_MAX_FILE_MB          largest accepted upload, in megabytes (default 10; keep
+                                server.maxUploadSize in .streamlit/config.toml at least this)
+    RESUME_MAX_PDF_PAGES        PDFs with more pages are rejected (default 20)
+    RESUME_MAX_BATCH_DOCUMENTS  most files processed per upload (default 200)
+    RESUME_MAX_CONCURRENT       documents extracted/preprocessed at once, server-wide (default: CPU count)
+"""
+import os
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+MAX_FILE_MB = float(os.environ.get("RESUME_MAX_FILE_MB", 10))
+MAX_PDF_PAGES = int(os.environ.get("RESUME_MAX_PDF_PAGES", 20))
+MAX_BATCH_DOCUMENTS = int(os.environ.get("RESUME_MAX_BATCH_DOCUMENTS", 200))
+MAX_CONCURRENT = int(os.environ.get("RESUME_MAX_CONCURRENT", os.cpu_count() or 2))
+
+class FairLimiter:
+    # Grants at most `slots` concurrent holders. Waiting sessions are served
+    # round-robin, so one session's large batch cannot starve the others.
+    def __init__(self, slots):
+        self.slots = slots
+        self.active = 0
+        self.queues = OrderedDict()
+        self.condition = threading.Condition()
+
+    def waiting(self):
+        with self.condition:
+            return sum(len(queue) for queue in self.queues.values())
+
+    @contextmanager
+    def slot(self, session):
+        ticket = object()
+        with self.condition:
+            self.queues.setdefault(session, deque()).append(ticket)
+            try:
+                while self.active >= self.slots or self._next() is not ticket:
+                    self.condition.wait()
+            except BaseException:
+                # Interrupted while waiting (e.g. the Streamlit script was stopped):
+                # withdraw the ticket so it can't block the queue
+                self._withdraw(session, ticket)
+                raise
+            # Served: this session goes to the back of the rotation
+            queue = self.queues.pop(session)
+            queue.popleft()
+            if queue:
+                self.queues[session] = queue
+            self.active += 1
+            self.condition.notify_all()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.condition.notify_all()
+
+    def _withdraw(self, session, ticket):
+        queue = self.queues[session]
+        queue.remove(ticket)
+        if not queue:
+            del self.queues[session]
+        self.condition.notify_all()
+
+    def _next(self):
+        session = next(iter(self.queues))
+        return self.queues[session][0]
+
+PROCESSING_LIMITER = FairLimiter(MAX_CONCURRENT)
+
+def admit_uploads(files):
+    # Split uploads into accepted files and rejection messages
+    accepted, rejected = [], []
+    for uploaded in files:
+        if len(accepted) >= MAX_BATCH_DOCUMENTS:
+            rejected.append(f"{uploaded.name}: only {MAX_BATCH_DOCUMENTS} documents are processed per upload")
+        elif uploaded.size > MAX_FILE_MB * 1024 * 1024:
+            rejected.append(f"{uploaded.name}: larger than {MAX_FILE_MB:g} MB")
+        else:
+            accepted.append(uploaded)
+    return accepted, rejected
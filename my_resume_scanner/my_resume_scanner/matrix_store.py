@@ -0,0 +1,324 @@
+"""On-disk resume archive with memory-mapped CSR term counts.
+
+A store directory holds:
+    meta.json               preprocessing engine, counts and file lengths
+    vocabulary.txt          archived terms, one per line in column order
+    ids.bin                 SHA-1 digest of each document's preprocessed text
+    data.bin / indices.bin  CSR term counts (float32) and column indices (int32)
+    indptr.bin              CSR row pointers (int64)
+    features.bin            per-document scoring features (FEATURE_DTYPE)
+    records.jsonl           document records without text, one per line
+    offsets.bin             byte offset of each line in records.jsonl (int64)
+
+Documents are appended in batches under a writer lock, skipping documents
+whose content is already archived, whatever their file name. Every file is
+only ever appended to and meta.json is replaced last, so readers never see a half-written
+batch and the next writer truncates it away. Documents are scored in
+fixed-size chunks with a running top-k, so peak memory depends on the chunk
+size and the vocabulary, not on the number of archived resumes.
+
+    python matrix_store.py build <folder of PDF/TXT resumes> [store dir]
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+import numpy as np
+from scipy.sparse import csr_matrix
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+from sklearn.feature_extraction.text import TfidfVectorizer
+from engine import (SCORE_WEIGHTS, SKILL_KEYWORDS, extract_text_from_pdf, preprocess_text, build_resume_record, section_features,
+                    record_features,
+                    extract_skills, extract_experience_requirements, experience_match_array, skill_match_array,
+                    overall_scores, rank_order)
+
+DEFAULT_STORE_DIR = os.environ.get("RESUME_ARCHIVE_DIR", "resume_archive")
+DEFAULT_CHUNK_SIZE = 20000
+
+FEATURE_DTYPE = np.dtype([("experience", "<f8"), ("ats_score", "<f8"), ("section_experience", "<f8"),
+                          ("section_ats_score", "<f8"), ("found", "<u4"), ("listed", "<u4")])
+ID_DTYPE = np.dtype("S20")
+_SKILL_BITS = 1 << np.arange(len(SKILL_KEYWORDS), dtype=np.uint32)
+_WRITE_LOCK = threading.Lock()
+
+# Same tokenization as the TfidfVectorizer used for in-memory matching
+_analyze = TfidfVectorizer().build_analyzer()
+
+def document_id(record):
+    # Archive key: the same resume uploaded under another file name is a duplicate,
+    # two candidates' "Resume.pdf" are not
+    return hashlib.sha1(record["text"].encode("utf-8")).digest()
+
+def _read_vocabulary(path, meta):
+    if not meta["vocabulary_bytes"]:
+        return {}
+    with open(os.path.join(path, "vocabulary.txt"), "rb") as f:
+        terms = f.read(meta["vocabulary_bytes"]).decode("utf-8").split("\n")[:-1]
+    return {term: column for column, term in enumerate(terms)}
+
+def _skill_bits(skills):
+    return sum(1 << i for i, skill in enumerate(SKILL_KEYWORDS) if skill in skills)
+
+def _unpack_skills(bits):
+    return (bits[:, None] & _SKILL_BITS) != 0
+
+class MatrixStoreWriter:
+    def __init__(self, path=DEFAULT_STORE_DIR):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+
+    def read_meta(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_path):
+            return {"engine": None, "n_docs": 0, "nnz": 0, "records_bytes": 0, "vocabulary_bytes": 0}
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @contextmanager
+    def _locked(self):
+        # One writer at a time: a lock for threads in this process and a file
+        # lock for other processes (other Streamlit servers, the build CLI)
+        with _WRITE_LOCK, open(os.path.join(self.path, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _file_lengths(self, meta):
+        # Bytes of every file that belong to the documents recorded in meta
+        n_docs, nnz = meta["n_docs"], meta["nnz"]
+        return {"data.bin": nnz * 4, "indices.bin": nnz * 4, "indptr.bin": (n_docs + 1) * 8 if n_docs else 0,
+                "features.bin": n_docs * FEATURE_DTYPE.itemsize, "offsets.bin": n_docs * 8,
+                "ids.bin": n_docs * ID_DTYPE.itemsize, "records.jsonl": meta["records_bytes"],
+                "vocabulary.txt": meta["vocabulary_bytes"]}
+
+    def _truncate(self, meta):
+        # Drop bytes left behind by a batch that failed before its meta was written
+        for file_name, length in self._file_lengths(meta).items():
+            file_path = os.path.join(self.path, file_name)
+            if os.path.exists(file_path) and os.path.getsize(file_path) > length:
+                os.truncate(file_path, length)
+
+    def _write_meta(self, meta):
+        # meta.json is replaced last and atomically, so readers only ever see complete batches
+        temp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, os.path.join(self.path, "meta.json"))
+
+    def archived_ids(self, meta):
+        if not meta["n_docs"]:
+            return set()
+        return set(np.fromfile(os.path.join(self.path, "ids.bin"), dtype=ID_DTYPE, count=meta["n_docs"]).tolist())
+
+    def add_batch(self, records):
+        # Append {name: record} built by engine.build_resume_record. Records whose
+        # text is already archived (or repeated in the batch) are skipped; returns
+        # the (added, skipped) names. All records of an archive must come from one
+        # preprocessing engine.
+        with self._locked():
+            meta = self.read_meta()
+            self._truncate(meta)
+            engines = {record["engine"] for record in records.values()} | ({meta["engine"]} if meta["n_docs"] else set())
+            if len(engines) > 1:
+                raise ValueError(f"Cannot mix preprocessing engines in one archive: {', '.join(sorted(engines))}")
+            archived = self.archived_ids(meta)
+            ids, skipped = [], []
+            for name, record in records.items():
+                record_id = document_id(record)
+                if record_id in archived:
+                    skipped.append(name)
+                else:
+                    archived.add(record_id)
+                    ids.append(record_id)
+            records = {name: record for name, record in records.items() if name not in set(skipped)}
+            if not records:
+                return [], skipped
+
+            vocabulary = _read_vocabulary(self.path, meta)
+            n_terms = len(vocabulary)
+            data, indices, indptr, offsets, lines = [], [], [], [], []
+            features = np.zeros(len(records), dtype=FEATURE_DTYPE)
+            nnz = meta["nnz"]
+            position = meta["records_bytes"]
+
+            for i, (name, record) in enumerate(records.items()):
+                counts = Counter(vocabulary.setdefault(term, len(vocabulary)) for term in _analyze(record["text"]))
+                columns = sorted(counts)
+                indices.extend(columns)
+                data.extend(counts[column] for column in columns)
+                nnz += len(columns)
+                indptr.append(nnz)
+
+                section_features(record)
+                features[i] = (record["experience"], record["ats_score"], record["section_experience"], record["section_ats_score"],
+                               _skill_bits(record["skills"]), _skill_bits(record["listed_skills"]))
+                line = (json.dumps({"name": name, **{key: value for key, value in record.items() if key != "text"}}) + "\n").encode("utf-8")
+                offsets.append(position)
+                position += len(line)
+                lines.append(line)
+
+            if meta["n_docs"] == 0:
+                indptr.insert(0, 0)
+            for file_name, array in (("data.bin", np.array(data, dtype=np.float32)),
+                                     ("indices.bin", np.array(indices, dtype=np.int32)),
+                                     ("indptr.bin", np.array(indptr, dtype=np.int64)),
+                                     ("features.bin", features),
+                                     ("offsets.bin", np.array(offsets, dtype=np.int64)),
+                                     ("ids.bin", np.array(ids, dtype=ID_DTYPE))):
+                with open(os.path.join(self.path, file_name), "ab") as f:
+                    array.tofile(f)
+            with open(os.path.join(self.path, "records.jsonl"), "ab") as f:
+                f.writelines(lines)
+            new_terms = "".join(term + "\n" for term in list(vocabulary)[n_terms:]).encode("utf-8")
+            with open(os.path.join(self.path, "vocabulary.txt"), "ab") as f:
+                f.write(new_terms)
+
+            meta["engine"] = engines.pop()
+            meta["n_docs"] += len(records)
+            meta["vocabulary_bytes"] += len(new_terms)
+            meta["nnz"] = nnz
+            meta["records_bytes"] = position
+            self._write_meta(meta)
+        return list(records), skipped
+
+class MatrixStore:
+    def __init__(self, path=DEFAULT_STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.engine = meta["engine"]
+        self.vocabulary = _read_vocabulary(path, meta)
+        self.n_docs = meta["n_docs"]
+        self.data = self._open("data.bin", np.float32, meta["nnz"])
+        self.indices = self._open("indices.bin", np.int32, meta["nnz"])
+        self.indptr = self._open("indptr.bin", np.int64, self.n_docs + 1)
+        self.features = self._open("features.bin", FEATURE_DTYPE, self.n_docs)
+        self.offsets = self._open("offsets.bin", np.int64, self.n_docs)
+
+    @staticmethod
+    def exists(path=DEFAULT_STORE_DIR):
+        return os.path.exists(os.path.join(path, "meta.json"))
+
+    def _open(self, file_name, dtype, length):
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, file_name), dtype=dtype, mode="r", shape=(length,))
+
+    def __len__(self):
+        return self.n_docs
+
+    def record(self, i):
+        with open(os.path.join(self.path, "records.jsonl"), "rb") as f:
+            f.seek(int(self.offsets[i]))
+            return json.loads(f.readline())
+
+    def rows(self, start, stop):
+        # CSR slice of documents [start, stop) backed by the memory-mapped arrays
+        first, last = self.indptr[start], self.indptr[stop]
+        return csr_matrix((self.data[first:last], self.indices[first:last], self.indptr[start:stop + 1] - first),
+                          shape=(stop - start, len(self.vocabulary)))
+
+def stream_top_k(store, job_text, weights=SCORE_WEIGHTS, k=10, chunk_size=DEFAULT_CHUNK_SIZE,
+                 required_skills=None, min_experience=None, section_aware=False, order_by="similarity"):
+    # Score the whole archive chunk by chunk, keeping only the best k candidates.
+    # With required_skills/min_experience (cascade mode) documents failing those
+    # checks on the stored features are pruned before any similarity work.
+    job_skills = extract_skills(job_text)
+    job_exp_min, job_exp_max = extract_experience_requirements(job_text)
+    job_mask = np.array([skill in job_skills for skill in SKILL_KEYWORDS])
+    experience_field, ats_field = ("section_experience", "section_ats_score") if section_aware else ("experience", "ats_score")
+
+    # A TF-IDF vectorizer fitted on the job alone has idf 1 for every term, so
+    # cosine similarity reduces to raw counts over the job's vocabulary
+    job_counts = Counter(_analyze(job_text))
+    job_norm = np.sqrt(sum(count * count for count in job_counts.values()))
+    known_terms = [term for term in job_counts if term in store.vocabulary]
+    columns = np.array([store.vocabulary[term] for term in known_terms], dtype=np.int64)
+    job_weights = np.array([job_counts[term] for term in known_terms], dtype=float)
+
+    required_bits = np.uint32(_skill_bits(required_skills or []))
+    stages = {"pool": len(store), "skills": 0, "experience": 0}
+
+    fields = ("similarity", "skills", "experience", "ats", "resume_exp")
+    best = {"indices": np.zeros(0, dtype=np.int64), "overall": np.zeros(0), **{field: np.zeros(0) for field in fields}}
+    for start in range(0, len(store), chunk_size):
+        stop = min(start + chunk_size, len(store))
+        features = store.features[start:stop]
+        survivors = (features["found"] & required_bits) == required_bits
+        stages["skills"] += int(survivors.sum())
+        if min_experience is not None:
+            survivors &= features[experience_field] >= min_experience
+        stages["experience"] += int(survivors.sum())
+        if not survivors.any():
+            continue
+        features = features[survivors]
+
+        counts = store.rows(start, stop)[survivors][:, columns].astype(float)
+        norms = np.sqrt(counts.multiply(counts).sum(axis=1)).A1
+        similarity = np.zeros(len(features))
+        np.divide(counts @ job_weights, norms * job_norm, out=similarity, where=norms * job_norm > 0)
+
+        chunk = {
+            "similarity": similarity,
+            "skills": skill_match_array(_unpack_skills(features["found"]), _unpack_skills(features["listed"]),
+                                        job_mask, section_aware),
+            "resume_exp": np.asarray(features[experience_field], dtype=float),
+            "ats": np.asarray(features[ats_field], dtype=float),
+        }
+        chunk["experience"] = experience_match_array(chunk["resume_exp"], job_exp_min, job_exp_max)
+        chunk["overall"] = overall_scores(chunk, weights)
+        chunk["indices"] = np.arange(start, stop)[survivors]
+
+        # Merge with the running top-k; earlier documents win exact ties like the in-memory sort
+        merged = {key: np.concatenate([best[key], chunk[key]]) for key in best}
+        keep = rank_order(merged["overall"], merged["similarity"], order_by)[:k]
+        best = {key: values[keep] for key, values in merged.items()}
+
+    best["job_skills"] = job_skills
+    best["job_exp"] = (job_exp_min, job_exp_max)
+    best["stages"] = stages
+    return best
+
+def top_k_components(store, best, section_aware=False):
+    # The stream_top_k result as score_components-style arrays in rank order, plus
+    # the records read back, so results_table and the page handle both pools alike
+    records = [store.record(i) for i in best["indices"]]
+    components = {key: best[key] for key in ("job_skills", "job_exp", "similarity", "skills", "resume_exp", "experience", "ats")}
+    components["names"] = [record["name"] for record in records]
+    components["missing_skills"] = [", ".join(skill for skill in best["job_skills"] if skill not in record["skills"]) for record in records]
+    components["ats_issues"] = ["; ".join(record_features(record, section_aware)[1]) for record in records]
+    return components, records
+
+def build_store(folder, path=DEFAULT_STORE_DIR, batch_size=500):
+    writer = MatrixStoreWriter(path)
+    batch = {}
+    for file_name in sorted(os.listdir(folder)):
+        file_path = os.path.join(folder, file_name)
+        if file_name.lower().endswith(".pdf"):
+            text = extract_text_from_pdf(file_path)
+        elif file_name.lower().endswith(".txt"):
+            with open(file_path, encoding="utf-8") as f:
+                text = f.read()
+        else:
+            continue
+        batch[file_name] = build_resume_record(preprocess_text(text), raw_text=text)
+        if len(batch) >= batch_size:
+            writer.add_batch(batch)
+            batch = {}
+    if batch:
+        writer.add_batch(batch)
+    return writer.read_meta()["n_docs"]
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "build":
+        sys.exit("Usage: python matrix_store.py build <resume folder> [store dir]")
+    n_docs = build_store(sys.argv[2], *sys.argv[3:4])
+    print(f"Archive now holds {n_docs} resumes")
@@ -1,96 +1,44 @@
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import os
-import re
+import uuid
 import nltk
-import spacy
-from datetime import datetime
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from PyPDF2 import PdfReader
 from streamlit_extras.metric_cards import style_metric_cards
-
-nlp = spacy.load("en_core_web_sm")
-
-SKILL_KEYWORDS = ["python", "java", "sql", "machine learning", "excel", "communication", "project management", "power bi", "r", "data analysis", "cloud", "aws", "azure"]
-
-def extract_text_from_pdf(pdf_file):
-    reader = PdfReader(pdf_file)
-    text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-    return text
-
-def preprocess_text(text):
-    doc = nlp(text.lower())
-    return " ".join([token.lemma_ for token in doc if not token.is_stop and not token.is_punct])
-
-def extract_skills(text):
-    return [skill for skill in SKILL_KEYWORDS if skill in text.lower()]
-
-def extract_experience(text):
-    text = text.lower()
-    total_experience = 0
-    years_set = set()
-    exp_matches = re.findall(r'(\d+)\s*(?:\+)?\s*(?:years?|yrs?)', text)
-    numeric_exp = [int(x) for x in exp_matches]
-    if numeric_exp:
-        total_experience = max(total_experience, max(numeric_exp))
-    range_matches = re.findall(r'(\d+)\s*[\u2013\-to]+\s*(\d+)\s*(?:years?|yrs?)', text)
-    for start, end in range_matches:
-        try:
-            total_experience = max(total_experience, int(end))
-        except:
-            continue
-    date_matches = re.findall(r'(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]\s+)?(\d{4})\s[\u2013\-to]+\s*(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\s+)?(\d{4}|present)', text)
-    for start_year, end_year in date_matches:
+from engine import (SCORE_WEIGHTS, EXPORT_FORMATS, PREPROCESSORS, AGREEMENT_SAMPLE_SIZE, extract_text_from_pdf,
+                    build_resume_record, record_features, preprocessing_agreement,
+                    extract_skills, extract_experience_requirements, cascade_filter, score_components,
+                    rank_candidates, results_table, export_results)
+from matrix_store import DEFAULT_STORE_DIR, MatrixStore, MatrixStoreWriter, stream_top_k, top_k_components
+from guardrails import MAX_PDF_PAGES, PROCESSING_LIMITER, admit_uploads
+from fast_tokenizer import LEMMAS
+
+@st.cache_resource
+def load_archive(path, modified):
+    # Reopened only when the archive changes on disk
+    return MatrixStore(path)
+
+@st.cache_data
+def fast_engine_agreement(texts):
+    return preprocessing_agreement(texts)
+
+def offer_export(job_name, make_table):
+    # Format picker and download button; the table is only built once asked for
+    export_format = st.selectbox("Export Format", list(EXPORT_FORMATS))
+    if st.button("Prepare Export"):
+        extension, mime = EXPORT_FORMATS[export_format]
         try:
-            start_year = int(start_year)
-            end_year = datetime.now().year if end_year == 'present' else int(end_year)
-            if 1950 <= start_year <= end_year <= datetime.now().year + 1:
-                for yr in range(start_year, end_year):
-                    years_set.add(yr)
-        except:
-            continue
-    total_experience = max(total_experience, len(years_set))
-    return total_experience
-
-def extract_experience_requirements(text):
-    text = text.lower()
-    range_match = re.search(r'(\d+)\s*(?:\+)?\s*(?:[\-\u2013to]{1,3})\s*(\d+)\s*(?:years?|yrs?)', text)
-    if range_match:
-        return int(range_match.group(1)), int(range_match.group(2))
-    single_match = re.search(r'(\d+)\s*(?:\+)?\s*(?:years?|yrs?)', text)
-    if single_match:
-        return int(single_match.group(1)), int(single_match.group(1)) + 2
-    return 0, 0
-
-def check_ats_format(text):
-    issues = []
-    score = 100  # Start with perfect score
-    
-    # Check for tables/columns
-    if re.search(r'\n\s*\|', text):
-        issues.append("Avoid using tables or columns in the resume.")
-        score -= 30
-    
-    # Check for required sections
-    required_sections = ["experience", "education", "skills"]
-    missing_sections = [section for section in required_sections if section not in text.lower()]
-    if missing_sections:
-        issues.append(f"Missing common resume headings: {', '.join(missing_sections)}")
-        score -= 20 * len(missing_sections)
-    
-    # Check for contact information
-    if not re.search(r'(phone|contact|email|e-mail|mobile)', text.lower()):
-        issues.append("Missing contact information")
-        score -= 15
-    
-    # Check for proper dates format
-    if re.search(r'\d{1,2}/\d{1,2}/\d{2,4}', text):
-        issues.append("Use full month names instead of numeric dates (e.g., 'January 2020' instead of '1/2020')")
-        score -= 10
-    
-    return issues, max(0, score)  # Ensure score doesn't go below 0
+            export_file = export_results(make_table(), export_format)
+        except ImportError as e:
+            st.error(f"⚠ {export_format} export is unavailable: {e}")
+        else:
+            st.download_button(
+                label=f"📄 Download Ranking as {export_format} (.{extension})",
+                data=export_file,
+                file_name=f"{os.path.splitext(job_name)[0]}_ranking.{extension}",
+                mime=mime
+            )
 
 # -------------------- Streamlit UI --------------------
 st.set_page_config(page_title="AI Resume Screener", layout="wide")
@@ -103,80 +51,201 @@ with st.sidebar:
     st.markdown("##  Navigation")
     menu = ["📝 Jobs", "👤 Candidates", "🔍 Matching"]
     choice = st.radio("Select View", menu, label_visibility="collapsed")
+    st.markdown("##  Preprocessing")
+    # Without a lemma table the fast engine would skip lemmatization entirely
+    engines = [name for name in PREPROCESSORS if name != "Fast" or LEMMAS]
+    preprocessing_engine = st.radio("Preprocessing Engine", engines, key="preprocessing_engine",
+                                    help="Fast uses a regex tokenizer and a lemma lookup table instead of the spaCy pipeline.")
+    if not LEMMAS:
+        st.caption("⚠ Fast engine unavailable: no lemma table found (run `python fast_tokenizer.py lookups`).")
+    preprocess = PREPROCESSORS[preprocessing_engine]
+
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
 
 if choice.endswith("Jobs"):
     st.header("📝 Upload Job Descriptions")
     job_desc_files = st.file_uploader("Upload Job Descriptions (Text/PDF)", type=["txt", "pdf"], accept_multiple_files=True)
 
     if job_desc_files:
+        job_desc_files, rejected = admit_uploads(job_desc_files)
         job_descs = {}
-        for job_file in job_desc_files:
-            text = extract_text_from_pdf(job_file) if job_file.type == "application/pdf" else job_file.getvalue().decode("utf-8")
-            job_descs[job_file.name] = preprocess_text(text)
-        st.session_state["job_descriptions"] = job_descs
-        st.success("✅ Job descriptions uploaded successfully!")
+        with st.spinner(f"Processing {len(job_desc_files)} job description(s)..."):
+            for job_file in job_desc_files:
+                # Extraction and preprocessing share a server-wide, fairly queued limit
+                with PROCESSING_LIMITER.slot(st.session_state["session_id"]):
+                    try:
+                        text = extract_text_from_pdf(job_file, MAX_PDF_PAGES) if job_file.type == "application/pdf" else job_file.getvalue().decode("utf-8")
+                    except ValueError as e:
+                        rejected.append(f"{job_file.name}: {e}")
+                        continue
+                    job_descs[job_file.name] = preprocess(text)
+        for message in rejected:
+            st.error(f"⚠ Skipped {message}")
+        if job_descs:
+            st.session_state["job_descriptions"] = job_descs
+            st.session_state["job_engine"] = preprocessing_engine
+            st.session_state.pop("score_components", None)
+            st.success("✅ Job descriptions uploaded successfully!")
+        else:
+            st.error("❌ None of the uploaded job descriptions could be processed; the previous ones are kept.")
 
 elif choice.endswith("Candidates"):
     st.header("👤 Upload Candidate Resumes")
     resume_files = st.file_uploader("Upload Resumes (PDF)", type=["pdf"], accept_multiple_files=True)
 
     if resume_files:
+        resume_files, rejected = admit_uploads(resume_files)
         resumes = {}
-        for resume_file in resume_files:
-            text = extract_text_from_pdf(resume_file)
-            resumes[resume_file.name] = preprocess_text(text)
-        st.session_state["resumes"] = resumes
-        st.success("✅ Resumes uploaded successfully!")
+        sample_texts = []
+        with st.spinner(f"Processing {len(resume_files)} resume(s)..."):
+            for resume_file in resume_files:
+                # Extraction and preprocessing share a server-wide, fairly queued limit
+                with PROCESSING_LIMITER.slot(st.session_state["session_id"]):
+                    try:
+                        text = extract_text_from_pdf(resume_file, MAX_PDF_PAGES)
+                    except ValueError as e:
+                        rejected.append(f"{resume_file.name}: {e}")
+                        continue
+                    resumes[resume_file.name] = build_resume_record(preprocess(text), preprocessing_engine, text)
+                if len(sample_texts) < AGREEMENT_SAMPLE_SIZE:
+                    sample_texts.append(text)
+        for message in rejected:
+            st.error(f"⚠ Skipped {message}")
+        if resumes:
+            st.session_state["resumes"] = resumes
+            st.session_state.pop("score_components", None)
+            st.success("✅ Resumes uploaded successfully!")
+
+            if preprocessing_engine == "Fast" and sample_texts:
+                with PROCESSING_LIMITER.slot(st.session_state["session_id"]):
+                    agreement = fast_engine_agreement(tuple(sample_texts))
+                st.info(f"⚡ Fast engine agrees with spaCy on {agreement:.1%} of tokens "
+                        f"(sample of {len(sample_texts)} resume(s)). Rankings may differ slightly.")
+
+            if st.button("💾 Add to Resume Archive"):
+                try:
+                    added, skipped = MatrixStoreWriter().add_batch(resumes)
+                except ValueError as e:
+                    st.error(f"❌ {e}. Re-upload these resumes with the archive's engine.")
+                else:
+                    st.success(f"✅ Added {len(added)} resume(s) to the archive.")
+                    if skipped:
+                        st.info(f"ℹ Skipped {len(skipped)} resume(s) whose content is already in the archive: {', '.join(skipped)}")
+        else:
+            st.error("❌ None of the uploaded resumes could be processed; the previous ones are kept.")
 
 elif choice.endswith("Matching"):
     st.header("🔍 Resume Matching and Feedback")
 
-    if "job_descriptions" in st.session_state and "resumes" in st.session_state:
+    archive = load_archive(DEFAULT_STORE_DIR, os.path.getmtime(os.path.join(DEFAULT_STORE_DIR, "meta.json"))) if MatrixStore.exists() else None
+    pool = st.radio("Candidate Pool", ["Uploaded Resumes", "Resume Archive"], horizontal=True) if archive else "Uploaded Resumes"
+    use_archive = pool == "Resume Archive"
+
+    if "job_descriptions" in st.session_state and (use_archive or "resumes" in st.session_state):
         job_names = list(st.session_state["job_descriptions"].keys())
         selected_job = st.selectbox("Select a Job Description", job_names)
 
-        if selected_job:
-            job_text = st.session_state["job_descriptions"][selected_job]
-            resume_texts = st.session_state["resumes"]
+        # Jobs and candidates must come from the same preprocessing engine to be comparable
+        job_engine = st.session_state.get("job_engine", "spaCy")
+        pool_engines = {archive.engine} if use_archive else {record["engine"] for record in st.session_state["resumes"].values()}
+        other_engines = pool_engines - {job_engine}
 
+        if other_engines:
+            st.error(f"❌ The job descriptions were preprocessed with the {job_engine} engine but the candidates with "
+                     f"{', '.join(sorted(other_engines))}. Re-upload them with the same engine.")
+        elif selected_job:
+            job_text = st.session_state["job_descriptions"][selected_job]
             job_skills = extract_skills(job_text)
             job_exp_min, job_exp_max = extract_experience_requirements(job_text)
 
-            vectorizer = TfidfVectorizer()
-            job_vector = vectorizer.fit_transform([job_text])
-            resume_vectors = vectorizer.transform(resume_texts.values())
-
-            scores = cosine_similarity(job_vector, resume_vectors).flatten()
-            ranked_resumes = sorted(zip(resume_texts.items(), scores), key=lambda x: x[1], reverse=True)
+            with st.expander("⚖ Scoring Weights"):
+                w1, w2, w3, w4 = st.columns(4)
+                weights = {
+                    "skills": w1.slider("Skill Match", 0.0, 1.0, SCORE_WEIGHTS["skills"], 0.05),
+                    "experience": w2.slider("Experience Match", 0.0, 1.0, SCORE_WEIGHTS["experience"], 0.05),
+                    "ats": w3.slider("ATS Score", 0.0, 1.0, SCORE_WEIGHTS["ats"], 0.05),
+                    "similarity": w4.slider("Text Similarity", 0.0, 1.0, SCORE_WEIGHTS["similarity"], 0.05),
+                }
+
+            rank_by = st.radio("Rank Candidates By", ["Text Similarity", "Weighted Overall Score"], horizontal=True)
+            order_by = "overall" if rank_by == "Weighted Overall Score" else "similarity"
+            if order_by == "overall":
+                st.info("ℹ Candidates are ranked by the weighted overall score below, not by text similarity "
+                        "to the job description as before, so the order can differ from earlier screenings.")
+
+            section_aware = st.checkbox("🧩 Section-Aware Scoring: read experience and ATS headings from detected sections, "
+                                        "with partial credit for skills not listed under Skills")
+            cascade = st.checkbox("🪜 Cascade Mode: prefilter on hard requirements before full scoring")
+            required_skills, min_experience = None, None
+            if cascade:
+                c1, c2 = st.columns(2)
+                required_skills = c1.multiselect("Required Skills", job_skills, default=job_skills)
+                min_experience = c2.number_input("Minimum Years of Experience", min_value=0, value=job_exp_min)
 
             st.subheader("📊 Resume Screening Results")
 
-            for i, ((resume_name, resume_text), score) in enumerate(ranked_resumes[:10], start=1):
-                resume_skills = extract_skills(resume_text)
-                resume_exp = extract_experience(resume_text)
-                ats_issues, ats_score = check_ats_format(resume_text)
-
-                skill_match = len(set(job_skills).intersection(resume_skills)) / len(job_skills) if job_skills else 0
-
-                # Improved experience matching calculation
-                if job_exp_min == 0 and job_exp_max == 0:
-                    experience_match = 0.7
-                elif resume_exp >= job_exp_max:
-                    experience_match = 1.0  # Full points for meeting or exceeding max
-                elif resume_exp >= job_exp_min:
-                    if job_exp_max>job_exp_min:
-                        experience_match = 0.7 + 0.3 * ((resume_exp - job_exp_min) / (job_exp_max - job_exp_min))
-                    else:
-                        experience_match = 0.9
-                elif resume_exp >0:
-                    experience_match = 0.3 * (resume_exp  / job_exp_min)
-                    
-                        
-                else:
-                    # Below minimum - scale down more aggressively
-                    experience_match = 0.0 
-
-                overall_score = round((skill_match * 0.5 + experience_match * 0.3 + (ats_score/100) * 0.2) * 100, 2)
+            if use_archive:
+                # Stream the memory-mapped archive; only the top 10 records are read back
+                best = stream_top_k(archive, job_text, weights, k=10,
+                                    required_skills=required_skills, min_experience=min_experience, section_aware=section_aware,
+                                    order_by=order_by)
+                stages = best["stages"]
+                st.caption(f"Searched {len(archive)} archived resumes.")
+
+                with st.expander("📥 Export Top Archive Matches"):
+                    # The whole archive may not fit in one file; export a streamed top-k instead
+                    export_count = st.number_input("Candidates to Export", min_value=1, max_value=max(len(archive), 1),
+                                                   value=min(100, max(len(archive), 1)))
+
+                    def archive_table():
+                        export_best = stream_top_k(archive, job_text, weights, k=export_count, required_skills=required_skills,
+                                                   min_experience=min_experience, section_aware=section_aware, order_by=order_by)
+                        export_components, _ = top_k_components(archive, export_best, section_aware)
+                        return results_table(selected_job, export_components, export_best["overall"],
+                                             np.arange(len(export_best["indices"])))
+                    offer_export(selected_job, archive_table)
+
+                components, records = top_k_components(archive, best, section_aware)
+                top_candidates = [(name, record, best["skills"][j], best["experience"][j], best["overall"][j])
+                                  for j, (name, record) in enumerate(zip(components["names"], records))]
+            else:
+                resume_records = st.session_state["resumes"]
+                components_key = (selected_job, job_engine, section_aware)
+                # Component arrays are computed once per job; weight changes only re-rank them
+                cached_components = st.session_state.setdefault("score_components", {})
+                if cascade:
+                    resume_records, stages = cascade_filter(resume_records, required_skills, min_experience, section_aware)
+                    components_key += (tuple(required_skills), min_experience)
+                    # Every prefilter setting scores a different pool; keep only the current one
+                    for key in [key for key in cached_components if len(key) > 3 and key != components_key]:
+                        del cached_components[key]
+
+                if components_key not in cached_components:
+                    cached_components[components_key] = score_components(job_text, resume_records, section_aware)
+                components = cached_components[components_key]
+                overall_scores, ranking = rank_candidates(components, weights, order_by)
+
+                with st.expander(f"📥 Export Full Ranking ({len(ranking)} candidates)"):
+                    offer_export(selected_job, lambda: results_table(selected_job, components, overall_scores, ranking))
+
+                top_candidates = [(components["names"][idx], resume_records[components["names"][idx]],
+                                   components["skills"][idx], components["experience"][idx], overall_scores[idx])
+                                  for idx in ranking[:10]]
+
+            if cascade:
+                s1, s2, s3 = st.columns(3)
+                s1.metric("Candidate Pool", stages["pool"])
+                s2.metric("Have Required Skills", stages["skills"],
+                          f"-{stages['pool'] - stages['skills']} pruned", delta_color="off")
+                s3.metric(f"Have {min_experience}+ Years (Fully Scored)", stages["experience"],
+                          f"-{stages['skills'] - stages['experience']} pruned", delta_color="off")
+                if not stages["experience"]:
+                    st.warning("⚠ No candidates survived the prefilters. Relax the required skills or minimum experience.")
+
+            for i, (resume_name, record, skill_match, experience_match, overall_score) in enumerate(top_candidates, start=1):
+                resume_skills = record["skills"]
+                resume_exp, ats_issues, ats_score = record_features(record, section_aware)
 
                 st.markdown(f"""
                     <div class="resume-box">
@@ -0,0 +1,158 @@
+import asyncio
+import pandas as pd
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+import api
+import golden
+from matrix_store import MatrixStoreWriter
+from engine import PREPROCESSORS, build_resume_record
+
+# The Fast engine keeps the service independent of the spaCy model
+CORPUS = golden.load_corpus()
+JOB = CORPUS["jobs"]["data_analyst.txt"]
+RESUMES = [{"name": name, "text": text} for name, text in CORPUS["resumes"].items()]
+
+def run(scenario, **options):
+    # Runs scenario(client) against a fresh app on aiohttp's in-process test server
+    async def main():
+        async with TestClient(TestServer(api.create_app("Fast", **options))) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+async def post_job(client, name="analyst", text=JOB):
+    response = await client.post("/jobs", json={"name": name, "text": text})
+    assert response.status == 201
+    return await response.json()
+
+async def ranking(client, name="analyst", **params):
+    response = await client.get(f"/jobs/{name}/ranking", params=params)
+    return response.status, await response.json()
+
+def test_add_single_and_batch_resumes():
+    async def scenario(client):
+        await post_job(client)
+        single = await client.post("/resumes", json=RESUMES[0])
+        batch = await client.post("/resumes", json={"resumes": RESUMES[1:]})
+        return single.status, await single.json(), batch.status, await batch.json(), await ranking(client, limit=10)
+    single_status, single, batch_status, batch, (status, body) = run(scenario)
+    assert (single_status, single) == (201, {"added": [RESUMES[0]["name"]]})
+    assert (batch_status, batch) == (201, {"added": [document["name"] for document in RESUMES[1:]]})
+    assert status == 200
+    assert sorted(row["candidate"] for row in body["results"]) == sorted(document["name"] for document in RESUMES)
+
+@pytest.mark.parametrize("body", [b"not json", b'{"name": "a.pdf"}', b'{"resumes": [{"name": 1, "text": "x"}]}', b"[]"])
+def test_malformed_resume_body_is_rejected(body):
+    async def scenario(client):
+        response = await client.post("/resumes", data=body, headers={"Content-Type": "application/json"})
+        return response.status
+    assert run(scenario) == 400
+
+def test_malformed_job_body_is_rejected():
+    async def scenario(client):
+        return (await client.post("/jobs", json={"name": "analyst"})).status
+    assert run(scenario) == 400
+
+def test_batch_limit(monkeypatch):
+    monkeypatch.setattr(api, "MAX_BATCH_DOCUMENTS", 2)
+    async def scenario(client):
+        return (await client.post("/resumes", json={"resumes": RESUMES[:3]})).status
+    assert run(scenario) == 413
+
+def test_size_limit(monkeypatch):
+    monkeypatch.setattr(api, "MAX_FILE_MB", 1 / 1024)
+    async def scenario(client):
+        return (await client.post("/resumes", json={"name": "big.pdf", "text": "python " * 200})).status
+    assert run(scenario) == 413
+
+def test_batch_larger_than_a_megabyte():
+    documents = [{"name": f"{i}_{document['name']}", "text": document["text"] * 20}
+                 for i in range(30) for document in RESUMES]
+    async def scenario(client):
+        response = await client.post("/resumes", json={"resumes": documents})
+        return response.status, await response.json()
+    assert sum(len(document["text"]) for document in documents) > 1024 * 1024
+    status, body = run(scenario)
+    assert status == 201 and len(body["added"]) == len(documents)
+
+def test_unknown_job():
+    async def scenario(client):
+        return await ranking(client, "missing")
+    assert run(scenario)[0] == 404
+
+def test_missing_archive(tmp_path):
+    async def scenario(client):
+        await post_job(client)
+        return await ranking(client, pool="archive")
+    assert run(scenario, archive_path=str(tmp_path / "none"))[0] == 404
+
+def test_ranking_before_any_resume():
+    async def scenario(client):
+        await post_job(client)
+        return await ranking(client)
+    assert run(scenario) == (200, {"job": "analyst", "results": []})
+
+def test_limit_and_weights():
+    async def scenario(client):
+        await post_job(client)
+        await client.post("/resumes", json={"resumes": RESUMES})
+        limited = await ranking(client, limit=2)
+        skills_only = await ranking(client, skills=1, experience=0, ats=0, similarity=0, order="overall")
+        invalid = await ranking(client, limit="ten")
+        invalid_order = await ranking(client, order="name")
+        return limited, skills_only, invalid, invalid_order
+    limited, skills_only, invalid, invalid_order = run(scenario)
+    assert limited[0] == 200 and len(limited[1]["results"]) == 2
+    results = skills_only[1]["results"]
+    assert [row["overall_score"] for row in results] == [round(row["skill_match"] * 100, 2) for row in results]
+    assert [row["overall_score"] for row in results] == sorted((row["overall_score"] for row in results), reverse=True)
+    assert invalid[0] == 400 and invalid_order[0] == 400
+
+def test_concurrent_requests_match_sequential_ones():
+    async def scenario(client):
+        await asyncio.gather(post_job(client), post_job(client, "java", CORPUS["jobs"]["java_developer.txt"]))
+        await asyncio.gather(*(client.post("/resumes", json=document) for document in RESUMES))
+        concurrent = await asyncio.gather(*(ranking(client, name, limit=10) for name in ["analyst", "java"] * 4))
+        sequential = [await ranking(client, name, limit=10) for name in ["analyst", "java"]]
+        return concurrent, sequential
+    concurrent, sequential = run(scenario)
+    assert all(response == sequential[i % 2] for i, response in enumerate(concurrent))
+    assert len(sequential[0][1]["results"]) == len(RESUMES)
+
+def test_archive_ranking_follows_archive_changes(tmp_path):
+    fast = PREPROCESSORS["Fast"]
+    records = {document["name"]: build_resume_record(fast(document["text"]), "Fast") for document in RESUMES}
+    names = list(records)
+    MatrixStoreWriter(tmp_path).add_batch({name: records[name] for name in names[:2]})
+
+    async def scenario(client):
+        await post_job(client)
+        before = await ranking(client, pool="archive", limit=10)
+        service = client.server.app["service"]
+        assert service.archive() is service.archive()
+        MatrixStoreWriter(tmp_path).add_batch(records)
+        after = await ranking(client, pool="archive", limit=10)
+        return before, after
+    before, after = run(scenario, archive_path=str(tmp_path))
+    assert before[0] == 200 and len(before[1]["results"]) == 2
+    assert after[0] == 200 and len(after[1]["results"]) == len(RESUMES)
+    assert set(after[1]["results"][0]) == set(before[1]["results"][0]) >= {"job", "resume_experience"}
+
+def test_archive_and_uploaded_rankings_match(tmp_path):
+    fast = PREPROCESSORS["Fast"]
+    MatrixStoreWriter(tmp_path).add_batch({document["name"]: build_resume_record(fast(document["text"]), "Fast", document["text"])
+                                           for document in RESUMES})
+    async def scenario(client):
+        await post_job(client)
+        await client.post("/resumes", json={"resumes": RESUMES})
+        return await ranking(client, order="overall", limit=10), await ranking(client, pool="archive", order="overall", limit=10)
+    uploaded, archived = run(scenario, archive_path=str(tmp_path))
+    assert uploaded[0] == archived[0] == 200
+    pd.testing.assert_frame_equal(pd.DataFrame(archived[1]["results"]), pd.DataFrame(uploaded[1]["results"]),
+                                  check_dtype=False, atol=1e-9)
+
+def test_archive_from_another_engine(tmp_path):
+    MatrixStoreWriter(tmp_path).add_batch({RESUMES[0]["name"]: build_resume_record(RESUMES[0]["text"], "spaCy")})
+    async def scenario(client):
+        await post_job(client)
+        return await ranking(client, pool="archive")
+    assert run(scenario, archive_path=str(tmp_path))[0] == 409
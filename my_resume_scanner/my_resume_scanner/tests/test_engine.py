@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+import engine
+import golden
+
+# A resume before and after preprocessing; line breaks survive preprocessing
+RAW = ("Jane Doe\nSummary\nProject manager with 6 years of experience.\nEducation technology specialist at a school.\n"
+       "Experience\nAnalyst, 2019 - 2022, 3 years\nSkills: Python, SQL\nexcel reporting")
+PREPROCESSED = ("jane doe\nsummary\nproject manager 6 year experience\neducation technology specialist school\n"
+                "experience\nanalyst 2019 2022 3 year\nskill python sql\nexcel reporting")
+
+def section_bodies(text, sections):
+    return {name: text[start:end].strip() for name, (start, end) in sections.items()}
+
+def test_segment_sections_with_raw_text():
+    sections = engine.segment_sections(PREPROCESSED, RAW)
+    assert section_bodies(PREPROCESSED, sections) == {
+        "summary": "project manager 6 year experience\neducation technology specialist school",
+        "experience": "analyst 2019 2022 3 year",
+        "skills": "python sql\nexcel reporting",
+    }
+
+def test_body_lines_starting_with_a_heading_word_are_not_headings():
+    record = engine.build_resume_record(PREPROCESSED, raw_text=RAW)
+    assert "projects" not in record["sections"] and "education" not in record["sections"]
+    assert engine.record_features(record, section_aware=True)[0] == 6
+    assert "education" in record["section_ats_issues"][0]
+
+def test_inline_headings_need_a_separator():
+    text = "skill | python sql\nproject manager 6 year"
+    assert section_bodies(text, engine.segment_sections(text)) == {"skills": "python sql\nproject manager 6 year"}
+    assert engine.segment_sections("skill python sql") == {}
+
+def test_raw_text_with_other_line_breaks_is_ignored():
+    assert engine.segment_sections("skill\npython", "Skills: Python\n\nextra") == {"skills": (5, 12)}
+
+def test_section_features_are_computed_on_first_use():
+    record = engine.build_resume_record(PREPROCESSED, raw_text=RAW)
+    assert "listed_skills" not in record
+    assert engine.skill_match_score(["python", "excel"], record, section_aware=True) == 1.0
+    assert {"python", "sql", "excel"} <= set(record["listed_skills"])
+
+def test_score_components_of_a_fully_pruned_pool():
+    texts = golden.load_corpus(golden.PREPROCESSED_DIR)["resumes"]
+    records = {name: engine.build_resume_record(text) for name, text in texts.items()}
+    survivors, stages = engine.cascade_filter(records, ["python"], 99)
+    components = engine.score_components("python sql 2 year experience", survivors)
+    overall, order = engine.rank_candidates(components)
+    assert stages["experience"] == 0
+    assert components["names"] == [] and len(components["similarity"]) == 0
+    assert len(overall) == 0 and len(order) == 0
+    assert engine.results_table("job", components, overall, order).empty
+
+def test_fast_engine_lemmatizes_with_the_shipped_table():
+    assert engine.PREPROCESSORS["Fast"]("Managed skills, years of Python.") == "manage skill year python"
+
+def test_fast_engine_keeps_what_the_ats_checks_look_for():
+    raw = golden.load_corpus()["resumes"]["dan_tables.txt"]
+    spacy_text = golden.load_corpus(golden.PREPROCESSED_DIR)["resumes"]["dan_tables.txt"]
+    fast = engine.build_resume_record(engine.PREPROCESSORS["Fast"](raw), "Fast", raw)
+    spacy = engine.build_resume_record(spacy_text, "spaCy", raw)
+    assert fast["ats_issues"] == spacy["ats_issues"]
+    assert fast["ats_score"] == spacy["ats_score"] == 25
+
+@pytest.mark.parametrize("fmt", list(engine.EXPORT_FORMATS))
+def test_export_results_round_trips(fmt):
+    texts = golden.load_corpus(golden.PREPROCESSED_DIR)
+    records = {name: engine.build_resume_record(text) for name, text in texts["resumes"].items()}
+    components = engine.score_components(texts["jobs"]["data_analyst.txt"], records)
+    overall, order = engine.rank_candidates(components)
+    table = engine.results_table("data_analyst.txt", components, overall, order)
+    read = {"CSV": pd.read_csv, "Parquet": pd.read_parquet, "Excel": pd.read_excel}[fmt]
+    exported = read(engine.export_results(table, fmt)).fillna("")
+    assert list(exported.columns) == list(table.columns)
+    assert exported["candidate"].tolist() == table["candidate"].tolist()
+    assert exported["overall_score"].tolist() == pytest.approx(table["overall_score"].tolist())
+    assert exported["ats_issues"].tolist() == table["ats_issues"].tolist()
+
+def test_export_results_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        engine.export_results(pd.DataFrame(), "PDF")
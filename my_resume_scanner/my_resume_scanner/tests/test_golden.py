@@ -0,0 +1,29 @@
+import json
+import pytest
+import engine
+import golden
+
+@pytest.fixture(scope="module")
+def expected():
+    with open(golden.EXPECTED_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture(scope="module")
+def inputs():
+    return golden.load_corpus(golden.PREPROCESSED_DIR)
+
+@pytest.mark.parametrize("path_name", list(golden.PATHS))
+def test_path_reproduces_golden_outputs(path_name, expected, inputs):
+    assert golden.check_path(expected, golden.run_path(inputs, golden.PATHS[path_name])) == []
+
+def test_preprocess_text_reproduces_golden_inputs(inputs):
+    model = golden.installed_model()
+    if model is None:
+        pytest.skip(f"{engine.SPACY_MODEL} is not installed")
+    assert golden.check_preprocessing(model, golden.load_corpus(), inputs) == []
+
+def test_inputs_from_another_model_fail(monkeypatch, inputs):
+    monkeypatch.setattr(engine, "preprocess_text", lambda text: text)
+    other = {"name": engine.SPACY_MODEL, "version": "0.0.0"}
+    assert golden.preprocessing_model() != other
+    assert len(golden.check_preprocessing(other, golden.load_corpus(), inputs)) == 1
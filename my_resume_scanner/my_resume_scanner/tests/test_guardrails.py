@@ -0,0 +1,76 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+import guardrails
+from guardrails import FairLimiter, admit_uploads
+
+class Interrupted(Exception):
+    pass
+
+def test_interrupted_waiter_leaves_the_queue(monkeypatch):
+    limiter = FairLimiter(1)
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with limiter.slot("first"):
+            holding.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait()
+
+    def interrupt(timeout=None):
+        raise Interrupted()
+    with monkeypatch.context() as patch:
+        patch.setattr(limiter.condition, "wait", interrupt)
+        with pytest.raises(Interrupted):
+            with limiter.slot("second"):
+                pass
+    assert limiter.waiting() == 0
+
+    release.set()
+    holder.join()
+    served = threading.Event()
+
+    def wait_for_slot():
+        with limiter.slot("third"):
+            served.set()
+    threading.Thread(target=wait_for_slot).start()
+    assert served.wait(5)
+
+def test_waiting_sessions_are_served_round_robin():
+    limiter = FairLimiter(1)
+    served, release = [], threading.Event()
+
+    def hold():
+        with limiter.slot("holder"):
+            release.wait()
+
+    def take(session):
+        with limiter.slot(session):
+            served.append(session)
+
+    threads = [threading.Thread(target=hold)]
+    threads[0].start()
+    # "batch" queues three documents before "single" queues its one
+    for session in ("batch", "batch", "batch", "single"):
+        queued = limiter.waiting()
+        threads.append(threading.Thread(target=take, args=(session,)))
+        threads[-1].start()
+        while limiter.waiting() == queued:
+            time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert served == ["batch", "single", "batch", "batch"]
+
+def test_admit_uploads(monkeypatch):
+    monkeypatch.setattr(guardrails, "MAX_BATCH_DOCUMENTS", 2)
+    monkeypatch.setattr(guardrails, "MAX_FILE_MB", 1)
+    files = [SimpleNamespace(name="a.pdf", size=1024), SimpleNamespace(name="big.pdf", size=2 * 1024 * 1024),
+             SimpleNamespace(name="b.txt", size=1024 * 1024), SimpleNamespace(name="c.pdf", size=10)]
+    accepted, rejected = admit_uploads(files)
+    assert [uploaded.name for uploaded in accepted] == ["a.pdf", "b.txt"]
+    assert rejected == ["big.pdf: larger than 1 MB", "c.pdf: only 2 documents are processed per upload"]
@@ -0,0 +1,90 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+import engine
+import golden
+from matrix_store import MatrixStore, MatrixStoreWriter, stream_top_k, top_k_components
+
+@pytest.fixture(scope="module")
+def records():
+    texts = golden.load_corpus(golden.PREPROCESSED_DIR)["resumes"]
+    return {name: engine.build_resume_record(text) for name, text in texts.items()}
+
+def archived_names(path):
+    store = MatrixStore(path)
+    return [store.record(i)["name"] for i in range(len(store))]
+
+def test_add_batch_skips_archived_resumes(tmp_path, records):
+    writer = MatrixStoreWriter(tmp_path)
+    names = list(records)
+    assert writer.add_batch({name: records[name] for name in names[:2]}) == (names[:2], [])
+    assert writer.add_batch(records) == (names[2:], names[:2])
+    assert archived_names(tmp_path) == names
+
+def test_add_batch_keys_resumes_by_content(tmp_path, records):
+    writer = MatrixStoreWriter(tmp_path)
+    first, second = list(records.values())[:2]
+    assert writer.add_batch({"Resume.pdf": first}) == (["Resume.pdf"], [])
+    assert writer.add_batch({"Resume.pdf": second, "copy.pdf": first}) == (["Resume.pdf"], ["copy.pdf"])
+    assert archived_names(tmp_path) == ["Resume.pdf", "Resume.pdf"]
+
+def test_meta_does_not_grow_with_the_archive(tmp_path, records):
+    writer = MatrixStoreWriter(tmp_path)
+    for name, record in records.items():
+        writer.add_batch({name: record})
+    assert set(writer.read_meta()) == {"engine", "n_docs", "nnz", "records_bytes", "vocabulary_bytes"}
+    store = MatrixStore(tmp_path)
+    clean_path = tmp_path / "clean"
+    MatrixStoreWriter(clean_path).add_batch(records)
+    assert store.vocabulary == MatrixStore(clean_path).vocabulary
+
+def test_add_batch_truncates_a_failed_batch(tmp_path, records):
+    writer = MatrixStoreWriter(tmp_path)
+    names = list(records)
+    writer.add_batch({names[0]: records[names[0]]})
+    for file_name in ("data.bin", "indices.bin", "indptr.bin", "features.bin", "offsets.bin", "ids.bin", "records.jsonl",
+                      "vocabulary.txt"):
+        with open(os.path.join(tmp_path, file_name), "ab") as f:
+            f.write(b"partial batch")
+    writer.add_batch(records)
+
+    with_failure = stream_top_k(MatrixStore(tmp_path), "python sql excel 2 year", k=len(records))
+    clean_path = tmp_path / "clean"
+    MatrixStoreWriter(clean_path).add_batch(records)
+    clean = stream_top_k(MatrixStore(clean_path), "python sql excel 2 year", k=len(records))
+    assert archived_names(tmp_path) == names
+    assert list(with_failure["indices"]) == list(clean["indices"])
+    assert list(with_failure["overall"]) == list(clean["overall"])
+
+def test_concurrent_writers_add_each_resume_once(tmp_path, records):
+    threads = [threading.Thread(target=MatrixStoreWriter(tmp_path).add_batch, args=(records,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(archived_names(tmp_path)) == sorted(records)
+
+def test_add_batch_refuses_to_mix_engines(tmp_path, records):
+    names = list(records)
+    writer = MatrixStoreWriter(tmp_path)
+    writer.add_batch({names[0]: records[names[0]]})
+    fast_record = engine.build_resume_record(records[names[1]]["text"], "Fast")
+    with pytest.raises(ValueError):
+        writer.add_batch({names[1]: fast_record})
+    assert archived_names(tmp_path) == names[:1]
+    assert MatrixStore(tmp_path).engine == "spaCy"
+
+def test_archive_table_matches_the_uploaded_pool(tmp_path, records):
+    job_text = golden.load_corpus(golden.PREPROCESSED_DIR)["jobs"]["data_analyst.txt"]
+    MatrixStoreWriter(tmp_path).add_batch(records)
+    store = MatrixStore(tmp_path)
+    best = stream_top_k(store, job_text, k=len(records))
+    archived, _ = top_k_components(store, best)
+    archive_table = engine.results_table("job", archived, best["overall"], np.arange(len(records)))
+
+    components = engine.score_components(job_text, records)
+    overall, order = engine.rank_candidates(components)
+    uploaded_table = engine.results_table("job", components, overall, order)
+    pd.testing.assert_frame_equal(archive_table, uploaded_table, check_dtype=False, atol=1e-9)